@@ -15,6 +15,7 @@ import os
 import time
 import json
 import yaml
+import functools
 import traceback
 import configparser
 from .log import logger
@@ -254,6 +255,35 @@ class Config(object):
             return
 
 
+@functools.lru_cache(maxsize=1)
+def cached_config():
+    """
+    Get the shared Config instance
+    :return: Config
+    """
+    return Config()
+
+
+@functools.lru_cache(maxsize=1)
+def _load_hash_set(mtime_ns, size):
+    """
+    Read hash file into a set, cached by file modification time and size
+    :param mtime_ns:
+    :param size:
+    :return: frozenset
+    """
+    return frozenset(cached_config().hash_list())
+
+
+def hash_set():
+    """
+    Get all hash set, only re-read when the hash file changed
+    :return: frozenset
+    """
+    stat = os.stat(cached_config().hash_path)
+    return _load_hash_set(stat.st_mtime_ns, stat.st_size)
+
+
 class Conf(object):
     def __init__(self, base_config_file):
         self.base_config_file = base_config_file
@@ -12,24 +12,303 @@
     :copyright: Copyright (c) 2018 Feei. All rights reserved
 """
 
+import os
 import re
+import html
+import httpx
 import socket
+import bisect
+import ipaddress
+import asyncio
+import functools
 import traceback
-import requests
+from itertools import islice
+from concurrent.futures import ThreadPoolExecutor
 from github import Github, GithubException
 from bs4 import BeautifulSoup
-from gsil.config import Config, public_mail_services, exclude_repository_rules, exclude_codes_rules
+from gsil.config import hash_set, home_path, public_mail_services, exclude_repository_rules, exclude_codes_rules
 from .process import Process, clone
-from IPy import IP
 from tld import get_tld
 from .log import logger
 
-# 正则表达式，用于匹配邮箱、主机、密码等敏感信息
-regex_mail = r"([a-zA-Z0-9_.+-]+@[a-zA-Z0-9-]+\.[a-zA-Z0-9-.]+)"
-regex_host = r"@([a-zA-Z0-9-]+\.[a-zA-Z0-9-.]+)"
-regex_pass = r"(pass|password|pwd)"
-regex_title = r"<title>(.*)<\/title>"
-regex_ip = r"^((([0-9]|[1-9][0-9]|1[0-9]{2}|2[0-4][0-9]|25[0-5])\.){3}([0-9]|[1-9][0-9]|1[0-9]{2}|2[0-4][0-9]|25[0-5]))$"
+try:
+    # 可选依赖：多关键字单次扫描（pyahocorasick），未安装时回退为逐行查找
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
+
+try:
+    # 可选依赖：GitHub API 响应缓存（requests-cache），未安装时不缓存
+    import requests_cache
+except ImportError:
+    requests_cache = None
+
+# 正则表达式，用于匹配邮箱、主机、密码等敏感信息（导入时预编译，避免每条结果重复查找正则缓存）
+RE_MAIL = re.compile(r"([a-zA-Z0-9_.+-]+@[a-zA-Z0-9-]+\.[a-zA-Z0-9-.]+)")
+RE_HOST = re.compile(r"@([a-zA-Z0-9-]+\.[a-zA-Z0-9-.]+)")
+RE_PASS = re.compile(r"(pass|password|pwd)")
+RE_TITLE = re.compile(r"<title[^>]*>([^<]{0,300})</title>", re.I | re.S)
+
+# 获取网站标题时的请求头
+title_headers = {
+    'Range': 'bytes=0-65535',
+    'User-Agent': 'gsil/1.0',
+}
+
+# 单个文件并发获取网站标题的最大请求数
+title_concurrency = 16
+
+# 主机 -> (网站地址, 网站标题)，避免同一主机的不同邮箱重复请求
+_TITLE_CACHE = {}
+
+# 与 str.splitlines() 一致的换行符，用于将字符偏移换算为行号
+LINE_BREAK_CHARS = '\n\r\v\f\x1c\x1d\x1e\x85\u2028\u2029'
+RE_LINE_BREAK = re.compile(r"\r\n|[\n\r\v\f\x1c\x1d\x1e\x85\u2028\u2029]")
+
+
+def _union_rules(rules):
+    """
+    将多条规则合并为单个分支正则，一次扫描即可判断是否命中任意规则
+    :param rules: 正则规则列表
+    :return: 编译后的正则，规则为空时返回 None
+    """
+    if len(rules) == 0:
+        return None
+    return re.compile('|'.join(f'(?:{rule})' for rule in rules))
+
+
+@functools.lru_cache(maxsize=64)
+def _automaton(keywords):
+    """
+    构建关键字的 Aho-Corasick 自动机（同一规则的关键字只构建一次）
+    :param keywords: 关键字元组
+    :return: ahocorasick.Automaton
+    """
+    automaton = ahocorasick.Automaton()
+    for i, kw in enumerate(keywords):
+        automaton.add_word(kw, (i, kw))
+    automaton.make_automaton()
+    return automaton
+
+
+@functools.lru_cache(maxsize=64)
+def _keywords_pattern(keywords):
+    """
+    构建匹配任一关键字的分支正则
+    :param keywords: 关键字元组
+    :return: 编译后的正则
+    """
+    return re.compile('|'.join(map(re.escape, keywords)))
+
+
+@functools.lru_cache(maxsize=64)
+def _keywords_bytes_pattern(keywords):
+    """
+    构建匹配任一关键字的字节正则，用于解码前的快速预筛
+    :param keywords: 关键字元组
+    :return: 编译后的字节正则
+    """
+    return re.compile(b'|'.join(re.escape(kw.encode('utf-8')) for kw in keywords))
+
+
+@functools.lru_cache(maxsize=4096)
+def _top_domain(host):
+    """
+    获取主机的主域名（解析结果缓存）
+    :param host: 主机名
+    :return: 主域名，解析失败时返回主机名本身
+    """
+    try:
+        return get_tld(host, fix_protocol=True)
+    except Exception as e:
+        logger.warning(f'get top domain exception {e}')
+        return host
+
+
+def _extract_title(response, default):
+    """
+    提取网页标题：优先在前 64KB 中正则查找，未命中再交给 BeautifulSoup 解析
+    :param response: 网页内容（bytes）
+    :param default: 未找到标题时的返回值
+    :return: 网站标题
+    """
+    match = RE_TITLE.search(response[:65536].decode('utf-8', errors='ignore'))
+    if match is not None:
+        return html.unescape(match.group(1)).strip()[0:150]
+    try:
+        soup = BeautifulSoup(response, "lxml")
+        if hasattr(soup.title, 'string'):
+            return soup.title.string.strip()[0:150]
+    except Exception as e:
+        traceback.print_exc()
+        return 'Exception'
+    return default
+
+
+def _is_ipv4(host):
+    """
+    判断主机是否为 IPv4 地址（四段均为不含前导零的 0-255 十进制数）
+    :param host: 主机名
+    :return: boolean
+    """
+    parts = host.split('.')
+    return len(parts) == 4 and all(
+        p.isdigit() and len(p) <= 3 and (p == '0' or p[0] != '0') and int(p) < 256 for p in parts)
+
+
+def _host_domain(host):
+    """
+    构造主机对应的网站地址
+    :param host: 邮箱主机部分
+    :return: (网站地址, 是否为内网 IP)
+    """
+    # 构造域名（尝试获取主域名）
+    if not _is_ipv4(host):
+        if _top_domain(host) == host:
+            return f'http://www.{host}', False
+        return f'http://{host}', False
+    # 若为内网 IP
+    return f'http://{host}', ipaddress.ip_address(host).is_private
+
+
+async def _fetch_title(client, semaphore, domain):
+    """
+    远程获取网站标题
+    :param client: httpx.AsyncClient
+    :param semaphore: 限制同时进行的请求数
+    :param domain: 网站地址
+    :return: 网站标题
+    """
+    try:
+        async with semaphore:
+            # 标题位于 <head> 中，只读取前 64KB，服务端忽略 Range 时也不会下载完整页面
+            response = b''
+            async with client.stream('GET', domain) as resp:
+                async for chunk in resp.aiter_bytes():
+                    response += chunk
+                    if len(response) >= 65536:
+                        break
+    except Exception as e:
+        return f'<{e}>'
+    return _extract_title(response[:65536], '<Unknown>')
+
+
+async def _fetch_titles(domains):
+    """
+    使用同一个客户端并发获取多个网站的标题
+    :param domains: 网站地址列表
+    :return: 与 domains 顺序一致的网站标题列表
+    """
+    # 同时进行的请求数不超过连接池大小，排队在信号量上进行，连接池获取不会超时
+    semaphore = asyncio.Semaphore(title_concurrency)
+    limits = httpx.Limits(max_connections=title_concurrency, max_keepalive_connections=title_concurrency)
+    async with httpx.AsyncClient(timeout=4, limits=limits, headers=title_headers, follow_redirects=True) as client:
+        return await asyncio.gather(*(_fetch_title(client, semaphore, domain) for domain in domains))
+
+
+def _resolve_hosts(hosts):
+    """
+    构造主机对应的网站地址并并发获取网站标题，结果按主机缓存
+    :param hosts: 邮箱主机列表
+    :return: {主机: (网站地址, 网站标题)}
+    """
+    resolved = {}
+    pending = {}
+    for host in hosts:
+        cached = _TITLE_CACHE.get(host)
+        if cached is not None:
+            resolved[host] = cached
+            continue
+        domain, is_inner_ip = _host_domain(host)
+        if is_inner_ip:
+            resolved[host] = _TITLE_CACHE[host] = (domain, '<Inner IP>')
+        else:
+            pending[host] = domain
+
+    # 远程获取网站标题，总耗时取决于最慢的一个而非所有请求之和
+    if len(pending) > 0:
+        titles = asyncio.run(_fetch_titles(list(pending.values())))
+        for (host, domain), title in zip(pending.items(), titles):
+            resolved[host] = _TITLE_CACHE[host] = (domain, title)
+    return resolved
+
+
+def _line_starts(code):
+    """
+    计算每行的起始偏移，分行方式与 str.splitlines() 一致
+    :param code: 代码正文
+    :return: 升序排列的偏移列表，长度即行数
+    """
+    line_starts = [0]
+    line_starts.extend(m.end() for m in RE_LINE_BREAK.finditer(code))
+    # 以换行结尾（或空文本）时末尾不构成新的一行
+    if line_starts[-1] == len(code):
+        line_starts.pop()
+    return line_starts
+
+
+def _line(code, line_starts, idx):
+    """
+    按行号截取一行（不含换行符）
+    :param code: 代码正文
+    :param line_starts: 每行起始偏移
+    :param idx: 行号
+    :return: 行内容
+    """
+    end = line_starts[idx + 1] if idx + 1 < len(line_starts) else len(code)
+    return code[line_starts[idx]:end].rstrip(LINE_BREAK_CHARS)
+
+
+# 预编译的仓库路径排除规则与代码误报规则
+_EXCLUDE_REPO_RE = _union_rules(exclude_repository_rules)
+_EXCLUDE_CODES_RE = _union_rules(exclude_codes_rules)
+
+
+@functools.lru_cache(maxsize=4096)
+def _exclude_repo_cached(full_path):
+    """
+    检查完整项目路径是否命中排除规则（规则运行期间不变，结果缓存）
+    :param full_path: 小写的完整项目路径（仓库全名/文件路径）
+    :return: True-需排除, False-正常处理
+    """
+    if _EXCLUDE_REPO_RE is None:
+        return False
+    return _EXCLUDE_REPO_RE.search(full_path) is not None
+
+
+def _install_github_cache():
+    """
+    为 GitHub 代码搜索结果页安装本地响应缓存（每个进程安装一次）
+    只缓存搜索结果页，文件内容等其它请求不缓存；缓存的结果页每次使用前都会携带 ETag 发起条件请求，
+    未变化时 GitHub 返回 304，既保证结果实时又节省 API 配额；过期条目在安装时清理
+    :return:
+    """
+    if requests_cache is None or requests_cache.is_installed():
+        return
+    requests_cache.install_cache(
+        github_cache_path,
+        backend='sqlite',
+        # 多个进程共用同一个缓存文件
+        wal=True,
+        expire_after=requests_cache.DO_NOT_CACHE,
+        urls_expire_after={'*/search/code': github_cache_expire},
+        always_revalidate=True,
+    )
+    requests_cache.get_cache().delete(expired=True)
+
+
+def _clone(git_url, sha):
+    """
+    下载仓库代码（异常仅记录不影响后续处理）
+    :param git_url: 仓库地址
+    :param sha: 代码哈希，作为下载目录名
+    :return:
+    """
+    try:
+        clone(git_url, sha)
+    except Exception as e:
+        logger.warning(f'Clone {git_url} exception {e}')
+
 
 # 每页返回的最大条目数，提高效率减少请求次数
 per_page = 50
@@ -37,6 +316,21 @@ per_page = 50
 # 默认扫描页数，可根据实际需求调整
 default_pages = 4
 
+# GitHub 搜索结果页缓存文件及保留时长（秒）
+github_cache_path = os.path.join(home_path, 'github_cache')
+github_cache_expire = 24 * 60 * 60
+
+# 关键字数量或代码大小达到阈值时，改用 Aho-Corasick 自动机单次扫描
+ac_min_keywords = 8
+ac_min_code_size = 1024 * 1024
+
+# 单个文件最多保留的匹配片段数
+max_matches = 1000
+
+# 邮箱模式下每页并发匹配代码的线程数（网站标题探测在网络 I/O 期间会释放 GIL）
+max_workers = 8
+
+
 class Engine(object):
     """
     GitHub 搜索引擎核心类，实现自动化敏感信息检测与结果处理
@@ -48,10 +342,11 @@ class Engine(object):
         :param token: GitHub 访问令牌
         """
         self.token = token
+        # 在创建客户端前安装响应缓存，PyGithub 内部创建的会话才会使用缓存
+        _install_github_cache()
         # 初始化 GitHub API 客户端
         self.g = Github(login_or_token=token, per_page=per_page)
         self.rule_object = None
-        self.code = ''
         self.full_name = ''
         self.sha = ''
         self.url = ''
@@ -71,78 +366,136 @@ class Engine(object):
         :param total: 总结果数
         :return: True-继续处理后续页面，False-跳过当前规则
         """
-        for index, content in enumerate(pages_content):
-            current_i = page * per_page + index
-            base_info = f'[{self.rule_object.keyword}] [{current_i}/{total}]'
-
-            # 已经连续遇到多条“已处理过”的，直接跳过整个规则，避免浪费资源
-            if self.next_count == 0 and self.processed_count > 3:
-                logger.info(
-                    f'{base_info} Has encountered {self.processed_count} has been processed, skip the current rules!')
-                return False
+        # 邮箱模式需远程获取网站标题（网络 I/O），匹配提交到线程池并发执行；其它模式为纯计算，直接在主线程匹配
+        executor = ThreadPoolExecutor(max_workers=max_workers) if self.rule_object.mode == 'mail' else None
+        # 已提交、尚未汇总的匹配任务，按原始顺序排列
+        pending = []
+        try:
+            for index, content in enumerate(pages_content):
+                current_i = page * per_page + index
+                base_info = f'[{self.rule_object.keyword}] [{current_i}/{total}]'
+
+                # 已经连续遇到多条“已处理过”的，直接跳过整个规则，避免浪费资源
+                # 先汇总已提交的匹配任务，保证判断结果与逐条顺序处理一致
+                if self.next_count == 0 and self.processed_count > 3:
+                    self._collect(pending)
+                if self.next_count == 0 and self.processed_count > 3:
+                    logger.info(
+                        f'{base_info} Has encountered {self.processed_count} has been processed, skip the current rules!')
+                    return False
+
+                # 记录本条目的网页链接
+                self.url = content.html_url
+
+                # 获取 sha（唯一标识），有异常时跳过
+                try:
+                    self.sha = content.sha
+                except Exception as e:
+                    logger.warning(f'sha exception {e}')
+                    self.sha = ''
+                    self.url = ''
+
+                # 检查是否已处理过该 sha
+                if self.sha in self.hash_list:
+                    logger.info(f'{base_info} Processed, skip! ({self.processed_count})')
+                    self.processed_count += 1
+                    continue
+
+                # 记录代码路径
+                self.path = content.path
+                # 记录仓库全名（如 owner/repo）
+                self.full_name = content.repository.full_name.strip()
+                # 仓库路径黑名单过滤
+                if self._exclude_repository():
+                    logger.info(f'{base_info} Excluded because of the path, skip!')
+                    continue
+
+                # 获取代码正文内容（PyGithub 的连接不是线程安全的，只在主线程拉取）
+                try:
+                    raw = content.decoded_content
+                except Exception as e:
+                    logger.warning(f'Get Content Exception: {e} retrying...')
+                    continue
+
+                info = {
+                    'url': self.url,
+                    'hash': self.sha,
+                    'repository': self.full_name,
+                    'path': self.path,
+                }
+                if executor is None:
+                    self._add_result(current_i, base_info, content, info, *self._match(raw))
+                else:
+                    pending.append((current_i, base_info, content, info, executor.submit(self._match, raw)))
 
-            # 记录本条目的网页链接
-            self.url = content.html_url
+            self._collect(pending)
+        finally:
+            if executor is not None:
+                # 提前跳过规则时 pending 已汇总完毕，这里不会等待多余的任务
+                executor.shutdown(wait=True)
 
-            # 获取 sha（唯一标识），有异常时跳过
-            try:
-                self.sha = content.sha
-            except Exception as e:
-                logger.warning(f'sha exception {e}')
-                self.sha = ''
-                self.url = ''
-
-            # 检查是否已处理过该 sha
-            if self.sha in self.hash_list:
-                logger.info(f'{base_info} Processed, skip! ({self.processed_count})')
-                self.processed_count += 1
-                continue
+        return True
 
-            # 记录代码路径
-            self.path = content.path
-            # 记录仓库全名（如 owner/repo）
-            self.full_name = content.repository.full_name.strip()
-            # 仓库路径黑名单过滤
-            if self._exclude_repository():
-                logger.info(f'{base_info} Excluded because of the path, skip!')
-                continue
+    def _collect(self, pending):
+        """
+        按原始顺序在主线程汇总已提交的匹配任务，避免并发写入结果字典
+        :param pending: [(序号, 日志前缀, 搜索结果, 结果信息, Future)]
+        :return:
+        """
+        for current_i, base_info, content, info, future in pending:
+            self._add_result(current_i, base_info, content, info, *future.result())
+        pending.clear()
 
-            # 获取代码正文内容（自动解码为 utf-8）
-            try:
-                self.code = content.decoded_content.decode('utf-8')
-            except Exception as e:
-                logger.warning(f'Get Content Exception: {e} retrying...')
-                continue
+    def _add_result(self, current_i, base_info, content, info, code, match_codes):
+        """
+        记录单条结果的匹配内容并下载对应仓库
+        :param current_i: 结果序号
+        :param base_info: 日志前缀
+        :param content: 搜索结果（ContentFile）
+        :param info: 结果信息（url、hash、repository、path）
+        :param code: 代码正文
+        :param match_codes: 匹配到的代码片段
+        :return:
+        """
+        if len(match_codes) == 0:
+            logger.info(f'{base_info} Did not match the code, skip!')
+            return
+
+        # 构造本条扫描结果
+        result = dict(info, match_codes=match_codes, code=code)
+        # 代码内容进一步误报过滤，如果可能是无用信息，则放入疑似误报列表
+        if self._exclude_codes(match_codes):
+            logger.info(f'{base_info} Code may be useless, do not skip, add to list to be reviewed!')
+            self.exclude_result[current_i] = result
+        else:
+            self.result[current_i] = result
 
-            # 按规则匹配敏感内容
-            match_codes = self.codes()
-            if len(match_codes) == 0:
-                logger.info(f'{base_info} Did not match the code, skip!')
-                continue
+        # 如有命中结果，则自动下载对应仓库代码（可选后续进一步分析）
+        git_url = content.repository.html_url
+        _clone(git_url, info['hash'])
+        logger.info(f'{base_info} Processing is complete, the next one!')
+        self.next_count += 1
 
-            # 构造本条扫描结果
-            result = {
-                'url': self.url,
-                'match_codes': match_codes,
-                'hash': self.sha,
-                'code': self.code,
-                'repository': self.full_name,
-                'path': self.path,
-            }
-            # 代码内容进一步误报过滤，如果可能是无用信息，则放入疑似误报列表
-            if self._exclude_codes(match_codes):
-                logger.info(f'{base_info} Code may be useless, do not skip, add to list to be reviewed!')
-                self.exclude_result[current_i] = result
-            else:
-                self.result[current_i] = result
+    def _match(self, raw):
+        """
+        解码单条结果的代码正文并按规则匹配（邮箱模式下在线程池中执行）
+        :param raw: 代码正文（bytes）
+        :return: (代码正文, 匹配到的代码片段)
+        """
+        # 行匹配模式下先在字节层面确认包含关键字，未命中则无需解码和拆分
+        if self.rule_object.mode in ('only-match', 'normal-match'):
+            if _keywords_bytes_pattern(tuple(self._keywords())).search(raw) is None:
+                return '', []
 
-            # 如有命中结果，则自动下载对应仓库代码（可选后续进一步分析）
-            git_url = content.repository.html_url
-            clone(git_url, self.sha)
-            logger.info(f'{base_info} Processing is complete, the next one!')
-            self.next_count += 1
+        # 解码为 utf-8 文本
+        code = raw.decode('utf-8', errors='replace')
 
-        return True
+        # 去除图片标签，防止误判（大多数代码不含图片标签，先判断以免复制整段文本）
+        if '<img' in code:
+            code = code.replace('<img', '')
+        # 按规则匹配敏感内容
+        # 限制单个文件的匹配片段数量，避免几乎每行都命中的文件占用过多内存
+        return code, list(islice(self.codes(code), max_matches))
 
     def verify(self):
         """
@@ -204,8 +557,8 @@ class Engine(object):
             logger.critical(msg)
             return False, self.rule_object, msg
 
-        # 获取已处理过的 sha 列表（避免重复处理）
-        self.hash_list = Config().hash_list()
+        # 获取已处理过的 sha 集合（避免重复处理），哈希文件未变化时直接复用
+        self.hash_list = hash_set()
 
         # 计算需要处理的页数
         if total < per_page:
@@ -241,66 +594,87 @@ class Engine(object):
             f'[{self.rule_object.keyword}] The current rules are processed, the process of normal exit!')
         return True, self.rule_object, len(self.result)
 
-    def codes(self):
+    def codes(self, code):
         """
-        按规则对象的匹配模式处理当前代码，返回匹配的片段列表
-        :return: 匹配到的代码行/片段列表
+        按规则对象的匹配模式处理代码，逐个生成匹配的片段，调用方可随时停止
+        :param code: 代码正文
+        :return: 匹配到的代码行/片段生成器
         """
-        # 去除图片标签，防止误判
-        self.code = self.code.replace('<img', '')
-        codes = self.code.splitlines()
-        codes_len = len(codes)
-        keywords = self._keywords()
-        match_codes = []
-
         # 邮箱模式：直接提取非公开邮箱
         if self.rule_object.mode == 'mail':
-            return self._mail()
+            yield from self._mail(code)
+            return
+
+        # 默认返回前 20 行
+        if self.rule_object.mode not in ('only-match', 'normal-match'):
+            yield from code.splitlines()[0:20]
+            return
+
+        keywords = self._keywords()
+        # 整段代码不含任何关键字时，无需计算行偏移
+        if not any(kw in code for kw in keywords):
+            return
+        # 每行起始偏移只计算一次，命中查找与上下文截取共用，只有输出的行才会切片生成字符串
+        line_starts = _line_starts(code)
+        codes_len = len(line_starts)
+
         # 仅匹配包含关键词的行
-        elif self.rule_object.mode == 'only-match':
-            for code in codes:
-                for kw in keywords:
-                    if kw in code:
-                        match_codes.append(code)
-            return match_codes
+        if self.rule_object.mode == 'only-match':
+            for idx in self._match_lines(code, line_starts, keywords):
+                yield _line(code, line_starts, idx)
         # 匹配包含关键词的行及其上下 3 行
-        elif self.rule_object.mode == 'normal-match':
-            for idx, code in enumerate(codes):
-                for keyword in keywords:
-                    if keyword in code:
-                        idxs = []
-                        # 匹配前 3 行
-                        for i in range(-3, -0):
-                            i_idx = idx + i
-                            if i_idx in idxs:
-                                continue
-                            if i_idx < 0:
-                                continue
-                            if codes[i_idx].strip() == '':
-                                continue
-                            logger.debug(f'P:{i_idx}/{codes_len}: {codes[i_idx]}')
-                            idxs.append(i_idx)
-                            match_codes.append(codes[i_idx])
-                        # 当前行
-                        if idx not in idxs:
-                            logger.debug(f'C:{idx}/{codes_len}: {codes[idx]}')
-                            match_codes.append(codes[idx])
-                        # 匹配后 3 行
-                        for i in range(1, 4):
-                            i_idx = idx + i
-                            if i_idx in idxs:
-                                continue
-                            if i_idx >= codes_len:
-                                continue
-                            if codes[i_idx].strip() == '':
-                                continue
-                            logger.debug(f'N:{i_idx}/{codes_len}: {codes[i_idx]}')
-                            idxs.append(i_idx)
-                            match_codes.append(codes[i_idx])
-            return match_codes
         else:
-            # 默认返回前 20 行
-            return self.code.splitlines()[0:20]
+            # 已输出的行号，多个命中行的上下文重叠时不重复输出
+            emitted = set()
+            for idx in self._match_lines(code, line_starts, keywords):
+                for i_idx in range(max(0, idx - 3), min(codes_len, idx + 4)):
+                    if i_idx in emitted:
+                        continue
+                    line = _line(code, line_starts, i_idx)
+                    if line.strip() == '':
+                        continue
+                    logger.debug(f'{i_idx}/{codes_len}: {line}')
+                    emitted.add(i_idx)
+                    yield line
+
+    @staticmethod
+    def _match_lines(code, line_starts, keywords):
+        """
+        查找包含任一关键字的行号
+        :param code: 代码正文
+        :param line_starts: 每行起始偏移
+        :param keywords: 关键字列表
+        :return: 升序生成的行号
+        """
+        # 关键字较多或代码较大时，使用 Aho-Corasick 自动机单次扫描整段代码
+        if ahocorasick is not None and (len(keywords) >= ac_min_keywords or len(code) >= ac_min_code_size):
+            # 命中按结束偏移升序给出，关键字不跨行，因此行号同样单调不减
+            last_idx = -1
+            for end, (_, kw) in _automaton(tuple(keywords)).iter(code):
+                idx = bisect.bisect_right(line_starts, end - len(kw) + 1) - 1
+                if idx != last_idx:
+                    last_idx = idx
+                    yield idx
+            return
+
+        # 单关键字（最常见）直接子串查找，多关键字使用预编译的分支正则，避免逐个关键字循环
+        kw = keywords[0] if len(keywords) == 1 else None
+        pattern = None if kw is not None else _keywords_pattern(tuple(keywords))
+        pos = 0
+        while pos < len(code):
+            if kw is not None:
+                pos = code.find(kw, pos)
+            else:
+                match = pattern.search(code, pos)
+                pos = -1 if match is None else match.start()
+            if pos == -1:
+                break
+            idx = bisect.bisect_right(line_starts, pos) - 1
+            yield idx
+            # 同一行只需命中一次，直接从下一行继续查找
+            if idx + 1 >= len(line_starts):
+                break
+            pos = line_starts[idx + 1]
 
     def _keywords(self):
         """
@@ -317,65 +691,40 @@ class Engine(object):
             else:
                 return [self.rule_object.keyword]
 
-    def _mail(self):
+    def _mail(self, code):
         """
         邮箱提取与归属判定，过滤公开邮箱，尝试获取域名网站标题
+        :param code: 代码正文
         :return: 匹配到的邮箱片段列表
         """
         logger.info(f'[{self.rule_object.keyword}] mail rule')
         match_codes = []
         mails = []
+        hosts = []
+        # 已处理的邮箱，集合查找避免邮箱较多时退化为 O(n²)
+        seen = set()
         # 正则提取所有邮箱
-        mail_multi = re.findall(regex_mail, self.code)
+        mail_multi = RE_MAIL.findall(code)
         for mm in mail_multi:
             mail = mm.strip().lower()
-            if mail in mails:
+            if mail in seen:
                 logger.info('[SKIPPED] Mail already processed!')
                 continue
             # 提取邮箱主机部分
-            host = re.findall(regex_host, mail)
+            host = RE_HOST.findall(mail)
             host = host[0].strip()
             # 过滤常见公开邮箱
             if host in public_mail_services:
                 logger.info('[SKIPPED] Public mail services!')
                 continue
+            seen.add(mail)
             mails.append(mail)
+            hosts.append(host)
 
-            # 构造域名（尝试获取主域名及网站标题）
-            is_inner_ip = False
-            if re.match(regex_ip, host) is None:
-                try:
-                    top_domain = get_tld(host, fix_protocol=True)
-                except Exception as e:
-                    logger.warning(f'get top domain exception {e}')
-                    top_domain = host
-                if top_domain == host:
-                    domain = f'http://www.{host}'
-                else:
-                    domain = f'http://{host}'
-            else:
-                # 若为内网 IP
-                if IP(host).iptype() == 'PRIVATE':
-                    is_inner_ip = True
-                domain = f'http://{host}'
-            title = '<Unknown>'
-            # 远程获取网站标题
-            if is_inner_ip is False:
-                try:
-                    response = requests.get(domain, timeout=4).content
-                except Exception as e:
-                    title = f'<{e}>'
-                else:
-                    try:
-                        soup = BeautifulSoup(response, "html5lib")
-                        if hasattr(soup.title, 'string'):
-                            title = soup.title.string.strip()[0:150]
-                    except Exception as e:
-                        title = 'Exception'
-                        traceback.print_exc()
-            else:
-                title = '<Inner IP>'
-
+        # 同一主机只解析、请求一次网站标题，不同主机并发请求
+        resolved = _resolve_hosts(list(dict.fromkeys(hosts)))
+        for mail, host in zip(mails, hosts):
+            domain, title = resolved[host]
             match_codes.append(f"{mail} {domain} {title}")
             logger.info(f' - {mail} {domain} {title}')
         return match_codes
@@ -385,13 +734,9 @@ class Engine(object):
         检查当前仓库路径是否命中排除规则（如 github.io 静态站等）
         :return: True-需排除, False-正常处理
         """
-        ret = False
         # 拼接完整的项目路径
         full_path = f'{self.full_name.lower()}/{self.path.lower()}'
-        for err in exclude_repository_rules:
-            if re.search(err, full_path) is not None:
-                return True
-        return ret
+        return _exclude_repo_cached(full_path)
 
     @staticmethod
     def _exclude_codes(codes):
@@ -400,8 +745,6 @@ class Engine(object):
         :param codes: 匹配到的代码片段
         :return: True-疑似误报, False-正常
         """
-        ret = False
-        for ecr in exclude_codes_rules:
-            if re.search(ecr, '\n'.join(codes)) is not None:
-                return True
-        return ret
+        if _EXCLUDE_CODES_RE is None:
+            return False
+        return _EXCLUDE_CODES_RE.search('\n'.join(codes)) is not None
@@ -0,0 +1,41 @@
+# -*- coding: utf-8 -*-
+
+"""
+    tests.test_config
+    ~~~~~~~~~~~~~~~~~
+
+    Implements test config
+
+    :author:    Feei <feei@feei.cn>
+    :homepage:  https://github.com/FeeiCN/gsil
+    :license:   GPL, see LICENSE for more details.
+    :copyright: Copyright (c) 2018 Feei. All rights reserved
+"""
+import pytest
+from gsil import config
+from gsil.config import Config, hash_set
+
+
+@pytest.fixture
+def home(tmp_path, monkeypatch):
+    # 哈希文件等写入临时目录，并清空按旧路径缓存的实例与哈希集合
+    monkeypatch.setattr(config, 'home_path', str(tmp_path))
+    config.cached_config.cache_clear()
+    config._load_hash_set.cache_clear()
+    yield tmp_path
+    config.cached_config.cache_clear()
+    config._load_hash_set.cache_clear()
+
+
+def test_hash_set(home):
+    Config().add_hash('sha1')
+    first = hash_set()
+    assert 'sha1' in first
+    # 哈希文件未变化时返回同一个集合，不重新读取
+    assert hash_set() is first
+
+    Config().add_hash('sha2')
+    second = hash_set()
+    assert second is not first
+    assert {'sha1', 'sha2'} <= second
+    assert hash_set() is second
@@ -0,0 +1,250 @@
+# -*- coding: utf-8 -*-
+
+"""
+    tests.test_engine
+    ~~~~~~~~~~~~~~~~~
+
+    Implements test engine
+
+    :author:    Feei <feei@feei.cn>
+    :homepage:  https://github.com/FeeiCN/gsil
+    :license:   GPL, see LICENSE for more details.
+    :copyright: Copyright (c) 2018 Feei. All rights reserved
+"""
+import asyncio
+import httpx
+import pytest
+from gsil import engine
+from gsil.config import Rule
+from gsil.engine import Engine, _is_ipv4, _host_domain, _line_starts, _line, _extract_title, _fetch_title
+
+CODE = 'a\r\nfoo mogujie.org\rb\x0bc\x85\n\nd\ne\nbar mogujie.org\nz\n'
+
+
+@pytest.mark.parametrize('host, expected', [
+    ('0.0.0.0', True),
+    ('8.8.8.8', True),
+    ('192.168.1.1', True),
+    ('255.255.255.255', True),
+    ('256.1.1.1', False),
+    ('1.2.3', False),
+    ('1.2.3.4.5', False),
+    ('01.2.3.4', False),
+    ('1.2.3.00', False),
+    ('1.2.3.0004', False),
+    ('1.2.3.', False),
+    ('a.b.c.d', False),
+    ('feei.cn', False),
+    ('mail.1.2.3', False),
+])
+def test_is_ipv4(host, expected):
+    assert _is_ipv4(host) is expected
+
+
+@pytest.mark.parametrize('host, inner', [
+    ('10.0.0.1', True),
+    ('172.16.0.1', True),
+    ('192.168.1.1', True),
+    ('127.0.0.1', True),
+    ('169.254.1.1', True),
+    ('0.1.2.3', True),
+    ('8.8.8.8', False),
+    ('114.114.114.114', False),
+])
+def test_host_domain_inner_ip(host, inner):
+    assert _host_domain(host) == (f'http://{host}', inner)
+
+
+@pytest.mark.parametrize('response, title', [
+    (b'<html><head><title>\n GSIL &amp; Feei </title></head></html>', 'GSIL & Feei'),
+    # 标题中含 "<" 时正则未命中，交给 lxml 解析
+    (b'<html><head><title>a<b</title></head></html>', 'a<b'),
+    (b'<html><body>no title</body></html>', '<Unknown>'),
+])
+def test_extract_title(response, title):
+    assert _extract_title(response, '<Unknown>') == title
+
+
+@pytest.mark.parametrize('body, title', [
+    (b'<title>GSIL</title>' + b' ' * 100000, 'GSIL'),
+    # 只读取前 64KB，之后的标题不会被找到
+    (b' ' * 70000 + b'<title>GSIL</title>', '<Unknown>'),
+])
+def test_fetch_title(body, title):
+    async def fetch():
+        transport = httpx.MockTransport(lambda request: httpx.Response(200, content=body))
+        async with httpx.AsyncClient(transport=transport) as client:
+            return await _fetch_title(client, asyncio.Semaphore(1), 'http://feei.cn')
+    assert asyncio.run(fetch()) == title
+
+
+@pytest.fixture
+def fetched(monkeypatch):
+    # 记录每次远程获取标题的网站地址，不发起真实请求
+    calls = []
+
+    async def fetch_titles(domains):
+        calls.append(domains)
+        return [f'title of {domain}' for domain in domains]
+    monkeypatch.setattr(engine, '_fetch_titles', fetch_titles)
+    monkeypatch.setattr(engine, '_TITLE_CACHE', {})
+    monkeypatch.setattr(engine, '_top_domain', lambda host: host)
+    return calls
+
+
+def test_mail(fetched):
+    e = _engine('"feei.cn"', 'mail')
+    code = 'Foo@feei.cn a@10.0.0.1 foo@feei.cn b@qq.com c@8.8.8.8 d@feei.cn a@10.0.0.1'
+    expected = [
+        'foo@feei.cn http://www.feei.cn title of http://www.feei.cn',
+        'a@10.0.0.1 http://10.0.0.1 <Inner IP>',
+        'c@8.8.8.8 http://8.8.8.8 title of http://8.8.8.8',
+        'd@feei.cn http://www.feei.cn title of http://www.feei.cn',
+    ]
+    # 邮箱去重后保持出现顺序，公开邮箱被过滤，同一主机只请求一次，内网 IP 不请求
+    assert e._mail(code) == expected
+    assert fetched == [['http://www.feei.cn', 'http://8.8.8.8']]
+
+    # 再次遇到相同主机时使用缓存
+    assert e._mail(code) == expected
+    assert e._mail('e@feei.cn f@1.1.1.1') == [
+        'e@feei.cn http://www.feei.cn title of http://www.feei.cn',
+        'f@1.1.1.1 http://1.1.1.1 title of http://1.1.1.1',
+    ]
+    assert fetched == [['http://www.feei.cn', 'http://8.8.8.8'], ['http://1.1.1.1']]
+
+
+@pytest.mark.parametrize('code', [
+    '',
+    '\n',
+    'a',
+    'a\r\nb',
+    'a\rb\r',
+    'a\x0bb\x85c',
+    'a\n\r\n\rb\n',
+    CODE,
+])
+def test_line_starts(code):
+    line_starts = _line_starts(code)
+    assert [_line(code, line_starts, i) for i in range(len(line_starts))] == code.splitlines()
+
+
+@pytest.fixture(params=['automaton', 'search'])
+def match_path(request, monkeypatch):
+    if request.param == 'automaton':
+        if engine.ahocorasick is None:
+            pytest.skip('pyahocorasick not installed')
+        monkeypatch.setattr(engine, 'ac_min_keywords', 1)
+    else:
+        monkeypatch.setattr(engine, 'ac_min_keywords', 100)
+        monkeypatch.setattr(engine, 'ac_min_code_size', 1 << 30)
+    return request.param
+
+
+@pytest.fixture(autouse=True)
+def no_github_cache(monkeypatch):
+    # 不在测试中全局替换 requests 会话，也不写入 ~/.gsil/github_cache
+    monkeypatch.setattr(engine, '_install_github_cache', lambda: None)
+
+
+def _engine(keyword, mode):
+    e = Engine(token='test')
+    e.rule_object = Rule(keyword=keyword, mode=mode)
+    return e
+
+
+def _codes(keyword, mode, code=CODE):
+    return list(_engine(keyword, mode).codes(code))
+
+
+def test_only_match(match_path):
+    assert _codes('"mogujie.org"', 'only-match') == ['foo mogujie.org', 'bar mogujie.org']
+    assert _codes('foo c', 'only-match') == ['foo mogujie.org', 'c']
+    assert _codes('"nothing"', 'only-match') == []
+
+
+def test_normal_match(match_path):
+    # 上下文窗口重叠的行只输出一次，空行不输出
+    assert _codes('"mogujie.org"', 'normal-match') == [
+        'a', 'foo mogujie.org', 'b', 'c', 'd', 'e', 'bar mogujie.org', 'z']
+    assert _codes('z', 'normal-match') == ['d', 'e', 'bar mogujie.org', 'z']
+    assert _codes('foo z', 'normal-match') == [
+        'a', 'foo mogujie.org', 'b', 'c', 'd', 'e', 'bar mogujie.org', 'z']
+    assert _codes('"nothing"', 'normal-match') == []
+
+
+class FakeContent(object):
+    """
+    模拟 PyGithub 的 ContentFile，读取 decoded_content 时计数
+    """
+    fetched = 0
+
+    def __init__(self, sha, raw=b'', full_name='feei/gsil', path='config.py'):
+        self.sha = sha
+        self.path = path
+        self.html_url = f'https://github.com/{full_name}/blob/master/{path}'
+        self.repository = type('Repository', (), {
+            'full_name': full_name,
+            'html_url': f'https://github.com/{full_name}',
+        })()
+        self._raw = raw
+
+    @property
+    def decoded_content(self):
+        FakeContent.fetched += 1
+        if self._raw is None:
+            raise IOError('fetch failed')
+        return self._raw
+
+
+@pytest.fixture
+def pages_engine(monkeypatch):
+    FakeContent.fetched = 0
+    clones = []
+    monkeypatch.setattr(engine, 'clone', lambda git_url, sha: clones.append(sha))
+
+    def factory(mode='normal-match', hash_list=()):
+        e = _engine('"mogujie.org"', mode)
+        e.result = {}
+        e.exclude_result = {}
+        e.hash_list = set(hash_list)
+        e.processed_count = 0
+        e.next_count = 0
+        e.clones = clones
+        return e
+    return factory
+
+
+@pytest.mark.parametrize('mode', ['normal-match', 'mail'])
+def test_process_pages_skip_rule(pages_engine, mode):
+    # 一条新的未命中结果后连续五条已处理过的，只拉取一次正文即跳过整个规则，不再拉取其后的新结果
+    processed = [f'sha{i}' for i in range(5)]
+    e = pages_engine(mode, processed)
+    pages_content = [FakeContent('new', b'nothing here')] + [FakeContent(sha) for sha in processed] + [
+        FakeContent(f'new{i}', b'foo mogujie.org\n') for i in range(44)]
+    assert e.process_pages(pages_content, 0, 50) is False
+    assert FakeContent.fetched == 1
+    assert e.processed_count == 4
+    assert e.result == {} and e.exclude_result == {} and e.clones == []
+
+
+def test_process_pages_results(pages_engine):
+    e = pages_engine(hash_list=['old'])
+    pages_content = [
+        FakeContent('old'),
+        FakeContent('hit', b'foo mogujie.org\n'),
+        FakeContent('miss', b'nothing here\n'),
+        FakeContent('failed', None),
+        FakeContent('useless', b'<a href="http://mogujie.org">\n'),
+        FakeContent('readme', b'foo mogujie.org\n', path='README.md'),
+        FakeContent('hit2', b'bar mogujie.org\n'),
+    ]
+    assert e.process_pages(pages_content, 1, 100) is True
+    assert FakeContent.fetched == 5
+    assert sorted(e.result) == [51, 56]
+    assert e.result[51]['hash'] == 'hit'
+    assert e.result[51]['match_codes'] == ['foo mogujie.org']
+    assert e.result[56]['repository'] == 'feei/gsil'
+    assert list(e.exclude_result) == [54]
+    assert e.clones == ['hit', 'useless', 'hit2']
+    assert (e.processed_count, e.next_count) == (1, 3)